@@ -1,16 +1,30 @@
 import json
-import pandas as pd
 import traceback
 from datetime import datetime
-from sklearn.preprocessing import StandardScaler
-from sklearn.cluster import KMeans
+from functools import lru_cache
+from operator import itemgetter
+
+# Fields of downtime_detail read by run_analysis; callers should select only these
+REQUIRED_COLUMNS = ("id", "machineNumber", "machineData", "totalDowntime")
+
+# Fields returned by the downtime_summary RPC and read by run_summary_analysis
+SUMMARY_COLUMNS = ("machineNumber", "failure_count", "total_downtime_ms", "machineData")
+
+# dtype of the clustering feature matrix; float32 halves it and KMeans/StandardScaler keep
+# the dtype (labels are checked against float64 in tests/unit/maintenance/analytics)
+FEATURE_DTYPE = "float32"
+
+@lru_cache(maxsize=4096)
+def _parse_purchase_date(value):
+    """Parse an ISO purchase date; cached because the same machines recur on every run"""
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
 
 def compute_machine_age(machine_data):
     """Calculate machine age in days from purchase date"""
     if isinstance(machine_data, dict) and 'purchaseDate' in machine_data:
         try:
             if isinstance(machine_data['purchaseDate'], str):
-                purchase_date = datetime.fromisoformat(machine_data['purchaseDate'].replace('Z', '+00:00'))
+                purchase_date = _parse_purchase_date(machine_data['purchaseDate'])
             else:
                 purchase_date = machine_data['purchaseDate']
             return (datetime.now() - purchase_date).days
@@ -19,8 +33,118 @@ def compute_machine_age(machine_data):
             return None
     return None
 
+def _machine_field(machine_data, key):
+    """Read a field from a machineData dict, defaulting to 'Unknown'"""
+    return machine_data.get(key, 'Unknown') if isinstance(machine_data, dict) else 'Unknown'
+
+def _cluster_machines(agg):
+    """
+    Cluster machines from per-machine aggregates.
+
+    ``agg`` has one row per machine with columns machineNumber, failure_count,
+    total_downtime_ms and machine_data (the machine's machineData dict).
+    """
+    import numpy as np
+    import pandas as pd
+
+    # The only remaining Python-level loop: unpack each machine's dict in one pass
+    machine_data = agg.pop('machine_data')
+    ages, makes, types = zip(*[
+        (compute_machine_age(d), _machine_field(d, 'make'), _machine_field(d, 'type'))
+        for d in machine_data
+    ]) if len(machine_data) else ((), (), ())
+    agg['machine_age'] = pd.to_numeric(pd.Series(ages, index=agg.index, dtype=object), errors='coerce')
+    agg['manufacturer'] = list(makes)
+    agg['machine_type'] = list(types)
+
+    agg = agg[agg['machine_age'].notnull()]
+
+    if len(agg) < 2:
+        print("Not enough machines with age data for clustering")
+        return {
+            "error": "Insufficient data",
+            "message": "Need at least 2 machines with age data for clustering analysis"
+        }
+
+    agg['machine_age_years'] = agg['machine_age'] / 365.0
+    agg['total_downtime_minutes'] = agg['total_downtime_ms'] / 60000.0
+
+    # ✅ Use 3 features for clustering now
+    features = np.ascontiguousarray(
+        agg[['failure_count', 'machine_age_years', 'total_downtime_minutes']].to_numpy(dtype=FEATURE_DTYPE)
+    )
+    # scikit-learn is imported here too, only when a clustering actually runs
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.cluster import KMeans
+
+    scaler = StandardScaler()
+    features_scaled = scaler.fit_transform(features)
+
+    print("Performing KMeans clustering...")
+    kmeans = KMeans(n_clusters=min(2, len(agg)), random_state=42)
+    agg['cluster'] = kmeans.fit_predict(features_scaled)
+
+    cluster_summary = agg.groupby('cluster').agg(
+        avg_failure_count=('failure_count', 'mean'),
+        avg_total_downtime=('total_downtime_minutes', 'mean'),
+        avg_machine_age_years=('machine_age_years', 'mean'),
+        n_machines=('machineNumber', 'count')
+    ).reset_index()
+
+    # 📌 Re-rank clusters by performance score (lower is better)
+    if len(cluster_summary) >= 2:
+        cluster_summary['performance_score'] = (
+            cluster_summary['avg_failure_count'] +
+            cluster_summary['avg_total_downtime'] +
+            cluster_summary['avg_machine_age_years']
+        )
+
+        if (cluster_summary.loc[cluster_summary['cluster'] == 1, 'performance_score'].values[0] <
+            cluster_summary.loc[cluster_summary['cluster'] == 0, 'performance_score'].values[0]):
+            print("Swapping cluster labels to ensure cluster 0 is the better performer")
+            agg['cluster'] = 1 - agg['cluster']
+
+            cluster_summary = agg.groupby('cluster').agg(
+                avg_failure_count=('failure_count', 'mean'),
+                avg_total_downtime=('total_downtime_minutes', 'mean'),
+                avg_machine_age_years=('machine_age_years', 'mean'),
+                n_machines=('machineNumber', 'count')
+            ).reset_index()
+
+            cluster_summary['performance_score'] = (
+                cluster_summary['avg_failure_count'] +
+                cluster_summary['avg_total_downtime'] +
+                cluster_summary['avg_machine_age_years']
+            )
+
+    # Calculate % differences from best cluster (cluster 0)
+    baseline_failure = cluster_summary.loc[cluster_summary['cluster'] == 0, 'avg_failure_count'].values[0]
+    baseline_downtime = cluster_summary.loc[cluster_summary['cluster'] == 0, 'avg_total_downtime'].values[0]
+
+    cluster_summary['pct_diff_failure'] = ((cluster_summary['avg_failure_count'] - baseline_failure) / max(baseline_failure, 0.001)) * 100
+    cluster_summary['pct_diff_downtime'] = ((cluster_summary['avg_total_downtime'] - baseline_downtime) / max(baseline_downtime, 0.001)) * 100
+
+    if 'performance_score' in cluster_summary.columns:
+        cluster_summary = cluster_summary.drop(columns=['performance_score'])
+
+    print("Machine Cluster analysis completed successfully")
+
+    return {
+        "aggregated_data": agg[['machineNumber', 'failure_count', 'machine_age_years', 'total_downtime_minutes', 'manufacturer', 'machine_type', 'cluster']].to_dict(orient='records'),
+        "cluster_summary": cluster_summary.to_dict(orient='records')
+    }
+
 def run_analysis(records=None):
-    """Perform machine clustering analysis based on failure count, age, and downtime"""
+    """
+    Perform machine clustering analysis based on failure count, age, and downtime.
+
+    Accepts a pandas DataFrame (one row per downtime event) or a list of record dicts.
+    Each record must contain every field in REQUIRED_COLUMNS:
+      - id: downtime event id (counted per machine)
+      - machineNumber: machine identifier used for grouping
+      - machineData: dict with 'purchaseDate', 'make' and 'type'
+      - totalDowntime: event downtime in milliseconds
+    """
     if records is None or len(records) == 0:
         print("Error: No maintenance records provided to Machine Cluster analysis")
         return {
@@ -28,98 +152,82 @@ def run_analysis(records=None):
             "message": "Machine Cluster analysis requires maintenance records to be provided"
         }
 
-    try:
-        print(f"Machine Cluster analysis: Processing {len(records)} records")
-        df = pd.DataFrame(records)
+    # pandas is imported here (like scikit-learn below) so importing this module stays cheap
+    import pandas as pd
 
-        if 'machineNumber' not in df.columns or 'machineData' not in df.columns:
-            return {
-                "error": "Missing required fields",
-                "message": "Fields 'machineNumber' and 'machineData' are required"
-            }
+    # Fail fast on a projection that dropped a needed field
+    fields = records.columns if isinstance(records, pd.DataFrame) else records[0]
+    missing = [col for col in REQUIRED_COLUMNS if col not in fields]
+    if missing:
+        return {
+            "error": "Missing required fields",
+            "message": f"Fields {', '.join(repr(c) for c in missing)} are required"
+        }
 
-        df['machine_age'] = df['machineData'].apply(compute_machine_age)
+    try:
+        print(f"Machine Cluster analysis: Processing {len(records)} records")
+        if isinstance(records, pd.DataFrame):
+            df = records
+        else:
+            # Extract just the required fields per record with one precompiled getter
+            df = pd.DataFrame.from_records(map(itemgetter(*REQUIRED_COLUMNS), records), columns=REQUIRED_COLUMNS)
 
         print("Aggregating data by machine...")
-        agg = df.groupby('machineNumber').agg(
+        # Event columns are reduced with built-in groupby aggregations; machineData is
+        # only unpacked once per machine afterwards instead of once per event
+        agg = df.groupby('machineNumber', sort=True).agg(
             failure_count=('id', 'count'),
             total_downtime_ms=('totalDowntime', 'sum'),
-            machine_age=('machine_age', 'first'),
-            manufacturer=('machineData', lambda x: x.iloc[0].get('make', 'Unknown') if isinstance(x.iloc[0], dict) else 'Unknown'),
-            machine_type=('machineData', lambda x: x.iloc[0].get('type', 'Unknown') if isinstance(x.iloc[0], dict) else 'Unknown')
-        ).reset_index()
-
-        agg = agg[agg['machine_age'].notnull()]
-
-        if len(agg) < 2:
-            print("Not enough machines with age data for clustering")
-            return {
-                "error": "Insufficient data",
-                "message": "Need at least 2 machines with age data for clustering analysis"
-            }
-
-        agg['machine_age_years'] = agg['machine_age'] / 365.0
-        agg['total_downtime_minutes'] = agg['total_downtime_ms'] / 60000.0
-
-        # ✅ Use 3 features for clustering now
-        features = agg[['failure_count', 'machine_age_years', 'total_downtime_minutes']].copy()
-        scaler = StandardScaler()
-        features_scaled = scaler.fit_transform(features)
-
-        print("Performing KMeans clustering...")
-        kmeans = KMeans(n_clusters=min(2, len(agg)), random_state=42)
-        agg['cluster'] = kmeans.fit_predict(features_scaled)
-
-        cluster_summary = agg.groupby('cluster').agg(
-            avg_failure_count=('failure_count', 'mean'),
-            avg_total_downtime=('total_downtime_minutes', 'mean'),
-            avg_machine_age_years=('machine_age_years', 'mean'),
-            n_machines=('machineNumber', 'count')
+            machine_data=('machineData', 'first')
         ).reset_index()
 
-        # 📌 Re-rank clusters by performance score (lower is better)
-        if len(cluster_summary) >= 2:
-            cluster_summary['performance_score'] = (
-                cluster_summary['avg_failure_count'] +
-                cluster_summary['avg_total_downtime'] +
-                cluster_summary['avg_machine_age_years']
-            )
-
-            if (cluster_summary.loc[cluster_summary['cluster'] == 1, 'performance_score'].values[0] <
-                cluster_summary.loc[cluster_summary['cluster'] == 0, 'performance_score'].values[0]):
-                print("Swapping cluster labels to ensure cluster 0 is the better performer")
-                agg['cluster'] = 1 - agg['cluster']
-
-                cluster_summary = agg.groupby('cluster').agg(
-                    avg_failure_count=('failure_count', 'mean'),
-                    avg_total_downtime=('total_downtime_minutes', 'mean'),
-                    avg_machine_age_years=('machine_age_years', 'mean'),
-                    n_machines=('machineNumber', 'count')
-                ).reset_index()
-
-                cluster_summary['performance_score'] = (
-                    cluster_summary['avg_failure_count'] +
-                    cluster_summary['avg_total_downtime'] +
-                    cluster_summary['avg_machine_age_years']
-                )
-
-        # Calculate % differences from best cluster (cluster 0)
-        baseline_failure = cluster_summary.loc[cluster_summary['cluster'] == 0, 'avg_failure_count'].values[0]
-        baseline_downtime = cluster_summary.loc[cluster_summary['cluster'] == 0, 'avg_total_downtime'].values[0]
-
-        cluster_summary['pct_diff_failure'] = ((cluster_summary['avg_failure_count'] - baseline_failure) / max(baseline_failure, 0.001)) * 100
-        cluster_summary['pct_diff_downtime'] = ((cluster_summary['avg_total_downtime'] - baseline_downtime) / max(baseline_downtime, 0.001)) * 100
+        return _cluster_machines(agg)
 
-        if 'performance_score' in cluster_summary.columns:
-            cluster_summary = cluster_summary.drop(columns=['performance_score'])
+    except Exception as e:
+        error_traceback = traceback.format_exc()
+        print(f"Error in Machine Cluster analysis: {str(e)}")
+        print(error_traceback)
+        return {
+            "error": str(e),
+            "traceback": error_traceback
+        }
 
-        print("Machine Cluster analysis completed successfully")
+def run_summary_analysis(summaries=None):
+    """
+    Perform the same clustering as run_analysis from per-machine aggregates computed
+    in the database (the downtime_summary RPC) instead of raw downtime events.
+
+    Each summary must contain every field in SUMMARY_COLUMNS:
+      - machineNumber: machine identifier
+      - failure_count: number of downtime events in the period
+      - total_downtime_ms: summed downtime in milliseconds
+      - machineData: dict with 'purchaseDate', 'make' and 'type'
+    """
+    if summaries is None or len(summaries) == 0:
+        print("Error: No machine summaries provided to Machine Cluster analysis")
+        return {
+            "error": "No data provided",
+            "message": "Machine Cluster analysis requires machine summaries to be provided"
+        }
 
+    missing = [col for col in SUMMARY_COLUMNS if col not in summaries[0]]
+    if missing:
         return {
-            "aggregated_data": agg[['machineNumber', 'failure_count', 'machine_age_years', 'total_downtime_minutes', 'manufacturer', 'machine_type', 'cluster']].to_dict(orient='records'),
-            "cluster_summary": cluster_summary.to_dict(orient='records')
+            "error": "Missing required fields",
+            "message": f"Fields {', '.join(repr(c) for c in missing)} are required"
         }
 
+    import pandas as pd
+
+    try:
+        print(f"Machine Cluster analysis: Processing {len(summaries)} machine summaries")
+        agg = pd.DataFrame.from_records(summaries, columns=SUMMARY_COLUMNS) \
+            .rename(columns={'machineData': 'machine_data'}) \
+            .sort_values('machineNumber', ignore_index=True)
+        agg['failure_count'] = pd.to_numeric(agg['failure_count'])
+        agg['total_downtime_ms'] = pd.to_numeric(agg['total_downtime_ms'])
+        return _cluster_machines(agg)
+
     except Exception as e:
         error_traceback = traceback.format_exc()
         print(f"Error in Machine Cluster analysis: {str(e)}")
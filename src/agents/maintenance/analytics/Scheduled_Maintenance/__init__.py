@@ -2,7 +2,7 @@
 
 import logging
 from typing import Dict, List, Any
-from .MachineCluster import run_analysis
+from .MachineCluster import run_analysis, run_summary_analysis, REQUIRED_COLUMNS, SUMMARY_COLUMNS
 from .machine_cluster_interpreter import interpret_results
 from .maintenance_task_scheduler import MaintenanceTaskScheduler
 from .maintenance_task_writer import MaintenanceTaskWriter
@@ -12,6 +12,9 @@ logger = logging.getLogger("maintenance_interpreter")
 
 __all__ = [
     'run_analysis',
+    'run_summary_analysis',
+    'REQUIRED_COLUMNS',
+    'SUMMARY_COLUMNS',
     'interpret_results',
     'MaintenanceTaskScheduler',
     'MaintenanceTaskWriter',
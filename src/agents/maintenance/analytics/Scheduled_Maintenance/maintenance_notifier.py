@@ -1,5 +1,5 @@
 import logging
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from .scheduled_maintenance_notification import send_maintenance_schedule_notification
 
 # Configure logging
@@ -9,9 +9,16 @@ logger = logging.getLogger("maintenance_notifier")
 class MaintenanceNotifier:
     """Handles notifications for scheduled maintenance tasks."""
     
-    def __init__(self):
-        """Initialize the maintenance notifier."""
+    def __init__(self, supabase_client: Optional[Any] = None):
+        """
+        Initialize the maintenance notifier.
+        
+        Args:
+            supabase_client: Supabase client reused for every notification, so sends
+                share one connection pool instead of creating a client each time
+        """
         logger.info("Initializing MaintenanceNotifier")
+        self.supabase = supabase_client
     
     def send_notifications(self, machines_to_service: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
@@ -42,7 +49,8 @@ class MaintenanceNotifier:
             notification_result = send_maintenance_schedule_notification(
                 schedule_results=schedule_results,
                 recipient="maintenance_manager",
-                notification_type="dashboard"
+                notification_type="dashboard",
+                supabase=self.supabase
             )
             
             if notification_result.get('status') == 'success':
@@ -67,6 +67,48 @@ class MaintenanceTaskScheduler:
             logger.warning("Using 'unassigned' as fallback.")
             return ("unassigned", "Unassigned")
             
+    def assign_mechanics(self, count: int) -> List[Tuple[str, str]]:
+        """
+        Assign mechanics for ``count`` new tasks using the same workload balancing
+        as assign_mechanic, but with one query for mechanics and one paged scan of
+        open tasks (paged so PostgREST's max-rows cap cannot truncate the workload).
+        Each assignment counts towards the chosen mechanic's workload for the next.
+        Returns a list of (employee_number, full_name) tuples.
+        """
+        if count <= 0:
+            return []
+        mechanics = self.get_mechanics()
+        if not mechanics:
+            logger.warning("No mechanics found. Using 'unassigned' as fallback.")
+            return [("unassigned", "Unassigned")] * count
+
+        workload: Dict[str, int] = {}
+        try:
+            open_tasks = self.db.query_table_paged(
+                'scheduled_maintenance',
+                columns='id,assignee',
+                filters={'status': 'open'},
+                order=('id',)
+            )
+            for task in open_tasks:
+                workload[task.get("assignee")] = workload.get(task.get("assignee"), 0) + 1
+        except Exception as e:
+            logger.error(f"Error getting open tasks for mechanics: {e}")
+            workload = {}
+
+        for mechanic in mechanics:
+            mechanic["current_workload"] = workload.get(mechanic.get("employee_number"), 0)
+
+        assignments = []
+        for _ in range(count):
+            min_workload = min(m["current_workload"] for m in mechanics)
+            selected_mechanic = random.choice([m for m in mechanics if m["current_workload"] == min_workload])
+            selected_mechanic["current_workload"] += 1
+            full_name = f"{selected_mechanic.get('name', '')} {selected_mechanic.get('surname', '')}".strip()
+            assignments.append((selected_mechanic.get("employee_number", "unassigned"), full_name))
+        logger.info(f"Assigned {count} tasks across {len(mechanics)} mechanics")
+        return assignments
+
     def schedule_maintenance_tasks(self, machines_to_service: List[Dict[str, Any]], max_tasks=None) -> Dict[str, Any]:
         """
         Schedule maintenance tasks for the identified machines.
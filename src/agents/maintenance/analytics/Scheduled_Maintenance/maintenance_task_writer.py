@@ -1,11 +1,16 @@
 # src/agents/maintenance/analytics/Scheduled_Maintenance/maintenance_task_writer.py
 
 import logging
+from itertools import islice
+from operator import itemgetter
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 
 logger = logging.getLogger("maintenance_writer")
 
+# Maximum number of rows sent in a single bulk insert request
+INSERT_BATCH_SIZE = 500
+
 class MaintenanceTaskWriter:
     """Writes maintenance tasks to the database."""
     
@@ -40,7 +45,7 @@ class MaintenanceTaskWriter:
             logger.error(f"Error checking existing tasks: {e}")
             return False
             
-    def write_maintenance_task(
+    def build_task(
         self,
         machine_id: str,
         machine_type: str,
@@ -50,23 +55,8 @@ class MaintenanceTaskWriter:
         assignee_name: str,
         priority: str = "medium",
         due_days: Optional[int] = None
-    ) -> Optional[Dict[str, Any]]:
-        """
-        Write a maintenance task to the database.
-        
-        Args:
-            machine_id: ID of the machine needing maintenance
-            machine_type: Type of the machine
-            issue_type: Type of issue (e.g., preventative_maintenance)
-            description: Description of the maintenance task
-            assignee: Employee ID of assigned mechanic
-            assignee_name: Full name of assigned mechanic
-            priority: Task priority (high, medium, low)
-            due_days: Days until task is due (default based on priority)
-            
-        Returns:
-            The created task record or None if error
-        """
+    ) -> Dict[str, Any]:
+        """Build a scheduled_maintenance row (see write_maintenance_task for arguments)."""
         # Set due date based on priority
         if due_days is None:
             due_days = 7 if priority == "high" else 14
@@ -75,7 +65,7 @@ class MaintenanceTaskWriter:
         due_date = now + timedelta(days=due_days)
         
         # Build task record with extra fields
-        task = {
+        return {
             "machine_id": machine_id,
             "machine_type": machine_type,
             "issue_type": issue_type,
@@ -87,6 +77,77 @@ class MaintenanceTaskWriter:
             "due_by": due_date.isoformat(),
             "created_at": now.isoformat(),
         }
+
+    def get_machines_with_open_tasks(self, machine_ids: List[str]) -> set:
+        """Return the subset of machine_ids that already have open maintenance tasks (one query)."""
+        if not machine_ids:
+            return set()
+        try:
+            result = self.db.table('scheduled_maintenance') \
+                .select('machine_id') \
+                .eq('status', 'open') \
+                .in_('machine_id', machine_ids) \
+                .execute()
+            tasks = result.data if result and hasattr(result, 'data') else []
+            return {task.get('machine_id') for task in tasks}
+        except Exception as e:
+            logger.error(f"Error checking existing tasks: {e}")
+            return set()
+
+    def insert_tasks(self, tasks: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Bulk insert task rows, one request per INSERT_BATCH_SIZE rows.
+        Returns (inserted records, failed batches); each failed batch is a dict
+        with its 'rows' and the 'error' message, and later batches are still tried.
+        """
+        inserted = []
+        failed = []
+        rows = iter(tasks)
+        while True:
+            batch = list(islice(rows, INSERT_BATCH_SIZE))
+            if not batch:
+                break
+            try:
+                result = self.db.table('scheduled_maintenance').insert(batch).execute()
+                data = result.data if result and hasattr(result, 'data') else []
+                inserted.extend(data)
+                logger.info(f"Inserted batch of {len(data)} tasks")
+            except Exception as e:
+                logger.error(f"Error inserting batch of {len(batch)} tasks: {e}")
+                failed.append({"rows": batch, "error": str(e)})
+        return inserted, failed
+
+    def write_maintenance_task(
+        self,
+        machine_id: str,
+        machine_type: str,
+        issue_type: str,
+        description: str,
+        assignee: str,
+        assignee_name: str,
+        priority: str = "medium",
+        due_days: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Write a maintenance task to the database.
+        
+        Args:
+            machine_id: ID of the machine needing maintenance
+            machine_type: Type of the machine
+            issue_type: Type of issue (e.g., preventative_maintenance)
+            description: Description of the maintenance task
+            assignee: Employee ID of assigned mechanic
+            assignee_name: Full name of assigned mechanic
+            priority: Task priority (high, medium, low)
+            due_days: Days until task is due (default based on priority)
+            
+        Returns:
+            The created task record or None if error
+        """
+        task = self.build_task(
+            machine_id, machine_type, issue_type, description,
+            assignee, assignee_name, priority, due_days
+        )
         
         logger.info(f"Creating task for machine {machine_id} (type: {machine_type}) assigned to {assignee_name} ({assignee})...")
         try:
@@ -118,24 +179,27 @@ class MaintenanceTaskWriter:
                 "tasks_created": 0
             }
             
-        tasks_created = []
         skipped_machines = []
         
+        # Skip machines that already have open tasks (single lookup for all machines)
+        existing = self.get_machines_with_open_tasks(list(map(itemgetter("machineNumber"), machines)))
+        to_create = []
         for machine in machines:
             machine_id = machine["machineNumber"]
-            machine_type = machine.get("machine_type", "Unknown")
-            
-            # Check if machine already has open tasks
-            if self.check_existing_tasks(machine_id):
+            if machine_id in existing:
                 logger.info(f"Machine {machine_id} already has an open task. Skipping.")
                 skipped_machines.append(machine_id)
                 continue
-                
-            # Assign mechanic using workload balancing algorithm
-            assignee, assignee_name = scheduler.assign_mechanic()
-            
-            # Create the maintenance task
-            task = self.write_maintenance_task(
+            to_create.append(machine)
+        
+        # Assign mechanics using workload balancing algorithm
+        assignments = scheduler.assign_mechanics(len(to_create))
+        
+        rows = []
+        for machine, (assignee, assignee_name) in zip(to_create, assignments):
+            machine_id = machine["machineNumber"]
+            machine_type = machine.get("machine_type", "Unknown")
+            rows.append(self.build_task(
                 machine_id=machine_id,
                 machine_type=machine_type,
                 issue_type="preventative_maintenance",
@@ -147,22 +211,28 @@ class MaintenanceTaskWriter:
                 assignee_name=assignee_name,
                 priority=machine["priority"],
                 due_days=7 if machine["priority"] == "high" else 14
-            )
-            
-            if task:
-                tasks_created.append(task)
-                logger.info(f"Created {machine['priority']} priority task for machine {machine_id}")
+            ))
+        
+        # Create the maintenance tasks in bulk
+        tasks_created, failed_batches = self.insert_tasks(rows)
+        tasks_failed = sum(len(batch["rows"]) for batch in failed_batches)
         
         # Return summary of the writing operation
         result = {
             "created": tasks_created,
             "skipped": skipped_machines,
             "tasks_created": len(tasks_created),
+            "tasks_failed": tasks_failed,
+            "failed_batches": failed_batches,
             "high_priority_count": schedule_results.get('high_priority_count', 0),
             "medium_priority_count": schedule_results.get('medium_priority_count', 0),
             "total_problematic_machines": schedule_results.get('total_problematic_machines', 0)
         }
         
+        if failed_batches:
+            result["error"] = f"Failed to insert {tasks_failed} of {len(rows)} tasks"
+            logger.error(result["error"])
+        
         logger.info(f"Task writing complete. Created {len(tasks_created)} tasks, skipped {len(skipped_machines)} machines.")
         return result
         
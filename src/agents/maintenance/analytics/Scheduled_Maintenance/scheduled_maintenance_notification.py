@@ -25,7 +25,8 @@ def get_supabase_client() -> Client:
 def send_maintenance_schedule_notification(
     schedule_results: Dict[str, Any],
     recipient: str = "maintenance_manager",
-    notification_type: str = "dashboard"
+    notification_type: str = "dashboard",
+    supabase: Optional[Client] = None
 ) -> Dict[str, Any]:
     """
     Send notification about scheduled maintenance tasks.
@@ -34,13 +35,15 @@ def send_maintenance_schedule_notification(
         schedule_results: Results from the maintenance scheduling operation
         recipient: Who should receive the notification
         notification_type: Type of notification (email, sms, dashboard, etc.)
+        supabase: Existing Supabase client to reuse (a new one is created if omitted)
         
     Returns:
         Dict containing notification status and details
     """
     try:
-        # Create Supabase client
-        supabase = get_supabase_client()
+        # Reuse the caller's Supabase client when given
+        if supabase is None:
+            supabase = get_supabase_client()
         
         # Create notification message
         tasks_created = schedule_results.get('tasks_created', 0)
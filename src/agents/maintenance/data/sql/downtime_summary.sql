@@ -0,0 +1,25 @@
+-- Per-machine downtime aggregates for the scheduled maintenance clustering.
+-- Called via supabase rpc("downtime_summary", {"p_start": ..., "p_end": ...});
+-- either bound may be null. The window is half-open: [p_start, p_end).
+-- Output columns match MachineCluster.SUMMARY_COLUMNS. "machineNumber" is unique per
+-- row; the workflow pages the result on it (SupabaseClient.call_rpc_paged).
+create or replace function downtime_summary(p_start timestamptz, p_end timestamptz)
+returns table (
+    "machineNumber" text,
+    failure_count bigint,
+    total_downtime_ms double precision,
+    "machineData" jsonb
+)
+language sql
+stable
+as $$
+    select
+        d."machineNumber"::text,
+        count(d.id),
+        coalesce(sum(d."totalDowntime"), 0)::double precision,
+        (array_agg(d."machineData" order by d.resolved_at, d.id))[1]::jsonb
+    from downtime_detail d
+    where (p_start is null or d.resolved_at >= p_start)
+      and (p_end is null or d.resolved_at < p_end)
+    group by d."machineNumber";
+$$;
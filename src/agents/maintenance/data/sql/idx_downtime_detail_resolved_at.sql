@@ -0,0 +1,6 @@
+-- B-tree index for the scheduled maintenance workflow's half-open
+-- resolved_at window (resolved_at >= start and resolved_at < end) and for
+-- keyset paging over (resolved_at, id).
+-- "concurrently" cannot run inside a transaction block; apply it on its own.
+create index concurrently if not exists idx_downtime_detail_resolved_at
+    on downtime_detail (resolved_at);
@@ -0,0 +1,49 @@
+-- Per-machine, per-day downtime rollup read by the scheduled maintenance workflow
+-- for whole-day windows, so it scans O(machines x days) rows instead of every event.
+-- Days are UTC days regardless of the session time zone.
+create materialized view if not exists mv_machine_daily as
+select
+    d."machineNumber"::text as "machineNumber",
+    (d.resolved_at at time zone 'UTC')::date as day,
+    count(d.id) as failure_count,
+    coalesce(sum(d."totalDowntime"), 0)::double precision as total_downtime_ms,
+    (array_agg(d."machineData" order by d.resolved_at, d.id))[1]::jsonb as "machineData"
+from downtime_detail d
+where d.resolved_at is not null
+group by 1, 2;
+
+-- Required for "refresh ... concurrently" and used for the day range scan
+create unique index if not exists idx_mv_machine_daily_machine_day
+    on mv_machine_daily ("machineNumber", day);
+create index if not exists idx_mv_machine_daily_day
+    on mv_machine_daily (day);
+
+-- Time of the last completed refresh per view. The workflow only reads
+-- mv_machine_daily for windows ending at or before refreshed_at.
+create table if not exists mv_refresh_log (
+    view_name text primary key,
+    refreshed_at timestamptz not null
+);
+
+-- Refresh and record the transaction start time, which precedes the refresh
+-- snapshot, so every event committed before refreshed_at is in the view
+create or replace function refresh_mv_machine_daily()
+returns void
+language plpgsql
+as $$
+begin
+    refresh materialized view concurrently mv_machine_daily;
+    insert into mv_refresh_log (view_name, refreshed_at)
+    values ('mv_machine_daily', now())
+    on conflict (view_name) do update set refreshed_at = excluded.refreshed_at;
+end;
+$$;
+
+-- Refresh nightly, after the previous day's events are resolved (pg_cron)
+create extension if not exists pg_cron;
+
+select cron.schedule(
+    'refresh-mv-machine-daily',
+    '0 2 * * *',
+    'select refresh_mv_machine_daily()'
+);
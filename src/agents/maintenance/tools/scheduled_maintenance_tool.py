@@ -17,7 +17,7 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(level
 logger = logging.getLogger("maintenance_workflow")
 
 # Import the workflow and date selector
-from ..workflows.scheduled_maintenance_workflow import ScheduledMaintenanceWorkflow
+from ..workflows.scheduled_maintenance_workflow import get_workflow
 from ..tools.date_selector import DateSelector
 from shared_services.supabase_client import SupabaseClient
 
@@ -73,8 +73,8 @@ def scheduled_maintenance_tool(
         action = action.strip().lower()
         logger.info(f"Processed action: {action}")
         
-        # Initialize the workflow
-        workflow = ScheduledMaintenanceWorkflow()
+        # Get the shared workflow instance (built once per process)
+        workflow = get_workflow()
         logger.info("Maintenance workflow initialized")
         
         # Handle date selection
@@ -83,22 +83,21 @@ def scheduled_maintenance_tool(
         
         if start_date and end_date:
             try:
-                period_start = datetime.strptime(start_date, "%Y-%m-%d")
-                period_end = datetime.strptime(end_date, "%Y-%m-%d")
+                period_start = datetime.fromisoformat(start_date)
+                period_end = datetime.fromisoformat(end_date)
                 logger.info(f"Using specified date range: {period_start.date()} to {period_end.date()}")
             except ValueError:
                 logger.warning(f"Invalid date format. Using DateSelector instead.")
                 start_date_str, end_date_str = DateSelector.get_date_range(mode=mode)
-                period_start = datetime.strptime(start_date_str, "%Y-%m-%d")
-                period_end = datetime.strptime(end_date_str, "%Y-%m-%d")
+                period_start = datetime.fromisoformat(start_date_str)
+                period_end = datetime.fromisoformat(end_date_str)
         else:
             # Use interactive date selection
             start_date_str, end_date_str = DateSelector.get_date_range(mode=mode)
-            period_start = datetime.strptime(start_date_str, "%Y-%m-%d")
-            period_end = datetime.strptime(end_date_str, "%Y-%m-%d")
+            period_start = datetime.fromisoformat(start_date_str)
+            period_end = datetime.fromisoformat(end_date_str)
         
-        # Set end date to end of day
-        period_end = period_end.replace(hour=23, minute=59, second=59, microsecond=999999)
+        # The workflow includes the whole end date (its upper bound is the next midnight)
         
         # Perform the requested action
         if action in ["run", "execute", "start", "analyze", "schedule"]:
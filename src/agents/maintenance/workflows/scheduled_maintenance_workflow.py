@@ -1,12 +1,19 @@
 # src/workflows/scheduled_maintenance_workflow.py
 import os
 import sys
+import copy
+import hashlib
 import logging
+import time
 import traceback
-from datetime import datetime
-from typing import Dict, List, Any, Optional
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Tuple
 from pathlib import Path
 
+import orjson
+from cachetools import TTLCache
+
 # Ensure src/ directory is on sys.path for absolute imports
 script_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.abspath(os.path.join(script_dir, "../../.."))
@@ -14,11 +21,12 @@ src_root = os.path.join(project_root, "src")
 if src_root not in sys.path:
     sys.path.insert(0, src_root)
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
+# Configure logging only when run as a script; importers keep their own configuration
+if __name__ == '__main__':
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
 logger = logging.getLogger("scheduled_maintenance_workflow")
 
 # Import modules
@@ -27,7 +35,7 @@ try:
     from src.config.settings import SUPABASE_URL, SUPABASE_KEY
     
     # Machine clustering
-    from agents.maintenance.analytics.Scheduled_Maintenance.MachineCluster import run_analysis
+    from agents.maintenance.analytics.Scheduled_Maintenance.MachineCluster import run_analysis, run_summary_analysis, REQUIRED_COLUMNS
     from agents.maintenance.analytics.Scheduled_Maintenance.machine_cluster_interpreter import interpret_results
     
     # Maintenance scheduling
@@ -38,12 +46,45 @@ try:
     # Database client
     from src.shared_services.supabase_client import SupabaseClient
     
-    logger.info("Successfully imported all required modules")
+    logger.debug("Successfully imported all required modules")
 except ImportError as e:
     logger.error(f"Import error: {e}")
     logger.error(traceback.format_exc())
     sys.exit(1)
 
+# Fewer downtime events than this in the period is too little data to cluster
+MIN_CLUSTER_ROWS = 20
+
+# Columns fetched from downtime_detail: what the clustering needs plus the paging key
+FETCH_COLUMNS = tuple(dict.fromkeys(REQUIRED_COLUMNS + ("resolved_at", "id")))
+
+def _iso(value):
+    """Return value as an ISO string if it is a date/datetime, otherwise unchanged."""
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+def _to_utc(value: str) -> datetime:
+    """Parse an ISO timestamp as an aware UTC datetime; naive values are taken to be UTC."""
+    dt = datetime.fromisoformat(value)
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt.astimezone(timezone.utc)
+
+# Process-wide Supabase client so repeated workflow runs share one connection pool
+_shared_db: Optional[SupabaseClient] = None
+
+def get_shared_db() -> SupabaseClient:
+    """Return the module-level SupabaseClient, creating it on first use."""
+    global _shared_db
+    if _shared_db is None:
+        _shared_db = SupabaseClient()
+    return _shared_db
+
+# Clustering + interpretation results keyed by a hash of the input records. The TTL
+# bounds how stale the machine ages (computed against "now") can get.
+_analysis_cache = TTLCache(maxsize=16, ttl=3600)
+
+# Final run summaries keyed by the normalized date filters, for repeated requests of the
+# same period (e.g. dashboard refreshes). Cleared whenever a run creates tasks.
+_result_cache = TTLCache(maxsize=32, ttl=300)
+
 class ScheduledMaintenanceWorkflow:
     """
     Scheduled Maintenance Workflow for maintenance data.
@@ -60,17 +101,194 @@ class ScheduledMaintenanceWorkflow:
             os.environ["SUPABASE_URL"] = SUPABASE_URL
             os.environ["SUPABASE_KEY"] = SUPABASE_KEY
             
-            self.db = SupabaseClient()
+            self.db = get_shared_db()
             self.scheduler = MaintenanceTaskScheduler(self.db)
             self.writer = MaintenanceTaskWriter(self.db)
-            self.notifier = MaintenanceNotifier()
-            logger.info("ScheduledMaintenanceWorkflow initialized successfully")
+            self.notifier = MaintenanceNotifier(self.db.client)
+            
+            # Every component must share this one client and its connection pool
+            assert self.scheduler.db is self.writer.db is self.db
+            assert self.notifier.supabase is self.db.client
+            logger.debug("ScheduledMaintenanceWorkflow initialized successfully")
         except Exception as e:
             logger.error(f"Error initializing ScheduledMaintenanceWorkflow: {e}")
             logger.error(traceback.format_exc())
             raise
 
+    @staticmethod
+    def _exclusive_end(period_end) -> str:
+        """Return midnight of the day after period_end as an ISO string (exclusive upper bound)."""
+        if isinstance(period_end, str):
+            period_end = datetime.fromisoformat(period_end)
+        elif not isinstance(period_end, datetime):
+            period_end = datetime(period_end.year, period_end.month, period_end.day)
+        end = (period_end + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+        return end.isoformat()
+
+    @classmethod
+    def _date_filters(cls, period_start, period_end) -> Dict[str, str]:
+        """
+        Build the resolved_at filters for the analysis period. The window is half-open
+        ([start, end + 1 day)) so every record on the end date is included and the
+        range can be served by idx_downtime_detail_resolved_at
+        (see agents/maintenance/data/sql/idx_downtime_detail_resolved_at.sql).
+        """
+        filters = {}
+        if period_start:
+            filters['resolved_at.gte'] = _iso(period_start)
+        if period_end:
+            filters['resolved_at.lt'] = cls._exclusive_end(period_end)
+        return filters
+
+    @staticmethod
+    def _daily_window(filters: Dict[str, str]) -> Optional[Tuple[str, str]]:
+        """
+        Return the (first_day, end_day_exclusive) ISO dates when the filter window covers
+        whole UTC days, the granularity of mv_machine_daily, else None. Naive bounds are
+        taken to be UTC, as Postgres reads them; aware bounds are converted to UTC.
+        """
+        start, end = filters.get('resolved_at.gte'), filters.get('resolved_at.lt')
+        if not start or not end:
+            return None
+        start_dt, end_dt = _to_utc(start), _to_utc(end)
+        midnight = dict(hour=0, minute=0, second=0, microsecond=0)
+        if start_dt != start_dt.replace(**midnight) or end_dt != end_dt.replace(**midnight):
+            return None
+        if end_dt - start_dt < timedelta(days=1):
+            return None
+        return start_dt.date().isoformat(), end_dt.date().isoformat()
+
+    def _mv_covers(self, end_day: str) -> bool:
+        """
+        True when the last refresh of mv_machine_daily, as recorded in mv_refresh_log,
+        happened at or after the UTC midnight starting end_day, i.e. the view already
+        contains every day before it. Uses the database's own clock, not this host's.
+        """
+        try:
+            rows = self.db.query_table(
+                "mv_refresh_log",
+                columns="refreshed_at",
+                filters={"view_name": "mv_machine_daily"},
+                limit=1
+            )
+        except Exception as e:
+            logger.warning(f"mv_refresh_log unavailable, not using mv_machine_daily: {e}")
+            return False
+        if not rows or not rows[0].get('refreshed_at'):
+            return False
+        return _to_utc(rows[0]['refreshed_at']) >= _to_utc(end_day)
+
+    def _fetch_daily_summaries(self, first_day: str, end_day: str) -> List[Dict[str, Any]]:
+        """
+        Read per-machine, per-day rollups from mv_machine_daily (see
+        agents/maintenance/data/sql/mv_machine_daily.sql) and fold them into one
+        summary per machine in SUMMARY_COLUMNS form.
+        """
+        import pandas as pd
+
+        daily = pd.DataFrame.from_records(list(self.db.query_table_paged(
+            table_name="mv_machine_daily",
+            columns="machineNumber,day,failure_count,total_downtime_ms,machineData",
+            filters={'day.gte': first_day, 'day.lt': end_day},
+            order=("machineNumber", "day")
+        )))
+        if daily.empty:
+            return []
+        summaries = daily.groupby('machineNumber', sort=True).agg(
+            failure_count=('failure_count', 'sum'),
+            total_downtime_ms=('total_downtime_ms', 'sum'),
+            machineData=('machineData', 'first')
+        ).reset_index()
+        return summaries.to_dict(orient='records')
+
+    def _fetch_records(self, filters: Dict[str, str]) -> Tuple[List[Dict[str, Any]], bool, int]:
+        """
+        Fetch the clustering input for the period. Returns (rows, summarized, event_count),
+        where event_count is the number of downtime events the rows represent.
+        
+        In order of preference:
+        1. Whole UTC days the view was last refreshed after: fold the mv_machine_daily
+           rollup (O(machines x days) rows).
+        2. The downtime_summary RPC (see agents/maintenance/data/sql/downtime_summary.sql),
+           which aggregates per machine inside Postgres.
+        3. Paging through raw downtime_detail events, e.g. if neither is deployed. Only
+           this path counts events up front, so periods with fewer than MIN_CLUSTER_ROWS
+           events are not paged at all.
+        """
+        window = self._daily_window(filters)
+        if window and self._mv_covers(window[1]):
+            try:
+                summaries = self._fetch_daily_summaries(*window)
+                return summaries, True, self._event_count(summaries)
+            except Exception as e:
+                logger.warning(f"mv_machine_daily unavailable, using downtime_summary instead: {e}")
+        
+        try:
+            # Paged so PostgREST's max-rows cap cannot drop machines from large plants
+            summaries = list(self.db.call_rpc_paged("downtime_summary", {
+                "p_start": filters.get('resolved_at.gte'),
+                "p_end": filters.get('resolved_at.lt')
+            }, order=("machineNumber",)))
+            return summaries, True, self._event_count(summaries)
+        except Exception as e:
+            logger.warning(f"downtime_summary RPC unavailable, reading raw events instead: {e}")
+        
+        event_count = self.db.count_rows("downtime_detail", filters)
+        if event_count < MIN_CLUSTER_ROWS:
+            return [], False, event_count
+        
+        # Page through the full period (run_analysis aggregates with pandas, so the pages are collected)
+        records = list(self.db.query_table_paged(
+            table_name="downtime_detail",
+            columns=",".join(FETCH_COLUMNS),
+            filters=filters,
+            order=("resolved_at", "id")
+        ))
+        return records, False, len(records)
+
+    @staticmethod
+    def _event_count(summaries: List[Dict[str, Any]]) -> int:
+        """Number of downtime events behind per-machine summaries (their summed failure_count)."""
+        return int(sum(summary.get('failure_count') or 0 for summary in summaries))
+
+    @staticmethod
+    def _records_digest(records: List[Dict[str, Any]]) -> str:
+        """Content hash of the fetched records, used as the analysis cache key."""
+        payload = orjson.dumps(records, option=orjson.OPT_SORT_KEYS, default=str)
+        return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
     def run(self, period_start: Optional[datetime] = None, period_end: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Run the scheduled maintenance workflow, reusing the summary of an identical
+        period run within the last few minutes (returned with result_cache_hit=True;
+        nothing is written on such a run).
+        
+        Only error-free runs that created no tasks and had no failed inserts are
+        cached; a run that creates tasks clears the cache, since open tasks affect
+        what later runs schedule.
+        See _execute for the steps and arguments.
+        """
+        try:
+            cache_key = tuple(sorted(self._date_filters(period_start, period_end).items()))
+        except (TypeError, ValueError):
+            # Unparseable period; let _execute report the error uncached
+            return self._execute(period_start, period_end)
+        
+        cached = _result_cache.get(cache_key)
+        if cached is not None:
+            logger.debug("Returning cached workflow result for %s", cache_key)
+            result = copy.deepcopy(cached)
+            result['result_cache_hit'] = True
+            return result
+        
+        result = self._execute(period_start, period_end)
+        if result['tasks_created'] > 0:
+            _result_cache.clear()
+        elif not result['errors'] and not result['tasks_failed']:
+            _result_cache[cache_key] = copy.deepcopy(result)
+        return result
+
+    def _execute(self, period_start: Optional[datetime] = None, period_end: Optional[datetime] = None) -> Dict[str, Any]:
         """
         Run the scheduled maintenance workflow:
         1. Fetch machine data
@@ -81,94 +299,110 @@ class ScheduledMaintenanceWorkflow:
         
         Args:
             period_start: Optional start date for the analysis period
-            period_end: Optional end date for the analysis period
+            period_end: Optional end date for the analysis period (the whole day is included)
             
-        Returns a summary of the workflow execution
+        Returns a summary of the workflow execution, including per-step timings in
+        seconds. Per-step progress is logged at DEBUG; a single INFO record with the
+        summary is emitted when the run finishes.
         """
         result_summary = {
             'analysis_success': False,
             'tasks_created': 0,
+            'tasks_failed': 0,
             'errors': [],
-            'period_start': period_start.isoformat() if isinstance(period_start, datetime) else period_start,
-            'period_end': period_end.isoformat() if isinstance(period_end, datetime) else period_end
+            'cache_hit': False,
+            'result_cache_hit': False,
+            'period_start': _iso(period_start),
+            'period_end': _iso(period_end),
+            'timings': {}
         }
+        timings = result_summary['timings']
+        run_started = step_started = time.perf_counter()
         
         try:
-            # Log analysis period if provided
-            if period_start and period_end:
-                logger.info(f"Analysis period: {period_start} to {period_end}")
-            
             # --- Step 1: Fetch machine data ---
-            logger.info("Fetching machine data...")
+            filters = self._date_filters(period_start, period_end)
+            logger.debug("Fetching machine data with filters %s", filters)
             
-            # Create filters based on date range
-            filters = {}
-            if period_start and period_end:
-                # Convert datetime objects to strings if needed
-                start_date_str = period_start.isoformat() if isinstance(period_start, datetime) else period_start
-                end_date_str = period_end.isoformat() if isinstance(period_end, datetime) else period_end
-                
-                # Use the correct filter format for date ranges
-                filters['resolved_at.gte'] = start_date_str
-                filters['resolved_at.lte'] = end_date_str
-                
-                logger.info(f"Filtering records by date range: {start_date_str} to {end_date_str}")
-            elif period_start:
-                start_date_str = period_start.isoformat() if isinstance(period_start, datetime) else period_start
-                filters['resolved_at.gte'] = start_date_str
-                logger.info(f"Filtering records from {start_date_str} onwards")
-            elif period_end:
-                end_date_str = period_end.isoformat() if isinstance(period_end, datetime) else period_end
-                filters['resolved_at.lte'] = end_date_str
-                logger.info(f"Filtering records up to {end_date_str}")
-
-            # Query the database with filters
-            records = self.db.query_table(
-                table_name="downtime_detail",
-                columns="*",
-                filters=filters,
-                limit=1000
-            )
+            records, summarized, record_count = self._fetch_records(filters)
+            timings['fetch'] = time.perf_counter() - step_started
+            result_summary['record_count'] = record_count
             
-            if not records:
-                msg = "No machine records found in database for the specified period"
+            # Too few events (counted from what was fetched) to cluster meaningfully
+            if not records or record_count < MIN_CLUSTER_ROWS:
+                if 0 < record_count < MIN_CLUSTER_ROWS:
+                    msg = (f"Only {record_count} machine records found for the specified period; "
+                           f"at least {MIN_CLUSTER_ROWS} are needed for clustering")
+                else:
+                    msg = "No machine records found in database for the specified period"
                 logger.warning(msg)
                 result_summary['errors'].append(msg)
                 return result_summary
                 
-            logger.info(f"Retrieved {len(records)} machine records")
+            logger.debug("Retrieved %d %s", len(records), 'machine summaries' if summarized else 'machine records')
             
-            # --- Step 2: Run machine clustering analysis ---
-            logger.info("Running machine clustering analysis...")
-            analysis_results = run_analysis(records)
+            # Identical record sets (e.g. re-running the same period) reuse the
+            # previous clustering and interpretation instead of recomputing them
+            cache_key = ('summary:' if summarized else 'events:') + self._records_digest(records)
+            cached = _analysis_cache.get(cache_key)
+            step_started = time.perf_counter()
             
-            if not analysis_results:
-                msg = "No results from machine clustering analysis"
-                logger.warning(msg)
-                result_summary['errors'].append(msg)
-                return result_summary
-            
-            result_summary['analysis_success'] = True
-            
-            # --- Step 3: Interpret results ---
-            logger.info("Interpreting clustering results...")
-            machines_to_service = interpret_results(analysis_results)
+            if cached is not None:
+                logger.debug("Reusing cached clustering results for identical records")
+                analysis_results, machines_to_service = copy.deepcopy(cached)
+                result_summary['cache_hit'] = True
+                result_summary['analysis_success'] = True
+            else:
+                # --- Step 2: Run machine clustering analysis ---
+                logger.debug("Running machine clustering analysis...")
+                if summarized:
+                    analysis_results = run_summary_analysis(records)
+                else:
+                    # run_analysis builds its frame from REQUIRED_COLUMNS only; resolved_at
+                    # is fetched just as the paging key and is never parsed
+                    analysis_results = run_analysis(records)
+                
+                if not analysis_results:
+                    msg = "No results from machine clustering analysis"
+                    logger.warning(msg)
+                    result_summary['errors'].append(msg)
+                    return result_summary
+                
+                result_summary['analysis_success'] = True
+                
+                # --- Step 3: Interpret results ---
+                logger.debug("Interpreting clustering results...")
+                machines_to_service = interpret_results(analysis_results)
+                timings['analysis'] = time.perf_counter() - step_started
+                
+                if 'error' not in analysis_results:
+                    _analysis_cache[cache_key] = copy.deepcopy((analysis_results, machines_to_service))
             
             if not machines_to_service:
-                logger.info("No machines identified for maintenance")
+                logger.debug("No machines identified for maintenance")
                 return result_summary
             
             # --- Step 4: Create maintenance tasks ---
-            logger.info("Creating maintenance tasks...")
+            step_started = time.perf_counter()
             schedule_results = self.scheduler.schedule_maintenance_tasks(machines_to_service)
             write_results = self.writer.write_maintenance_tasks(schedule_results, self.scheduler)
+            timings['write'] = time.perf_counter() - step_started
             
-            result_summary['tasks_created'] = write_results.get('tasks_created', 0)
+            # --- Step 5: Notify about the tasks actually created ---
+            if write_results.get('tasks_created', 0) > 0:
+                step_started = time.perf_counter()
+                logger.debug("Sending maintenance notifications...")
+                self.notifier.send_notifications(write_results['created'])
+                timings['notify'] = time.perf_counter() - step_started
             
-            # --- Step 5: Send notifications ---
-            if result_summary['tasks_created'] > 0:
-                logger.info("Sending maintenance notifications...")
-                self.notifier.send_notifications(machines_to_service)
+            result_summary['tasks_created'] = write_results.get('tasks_created', 0)
+            result_summary['tasks_failed'] = write_results.get('tasks_failed', 0)
+            if write_results.get('error'):
+                result_summary['errors'].append(write_results['error'])
+            for batch in write_results.get('failed_batches', []):
+                result_summary['errors'].append(
+                    f"Failed to insert batch of {len(batch['rows'])} tasks: {batch['error']}"
+                )
             
             return result_summary
             
@@ -178,6 +412,39 @@ class ScheduledMaintenanceWorkflow:
             logger.error(traceback.format_exc())
             result_summary['errors'].append(error_msg)
             return result_summary
+        
+        finally:
+            timings['total'] = time.perf_counter() - run_started
+            logger.info("workflow done %s", result_summary)
+
+
+@lru_cache(maxsize=1)
+def get_workflow() -> ScheduledMaintenanceWorkflow:
+    """
+    Return the process-wide ScheduledMaintenanceWorkflow, constructing it on first use.
+    The DB client, scheduler, writer and notifier are then reused by every run.
+    """
+    return ScheduledMaintenanceWorkflow()
+
+
+def serve(interval_hours: float = 24.0, lookback_days: int = 30) -> None:
+    """
+    Run the workflow repeatedly in this process instead of once per cron invocation.
+    
+    Each run analyses the ``lookback_days`` full UTC days up to and including yesterday,
+    then sleeps ``interval_hours`` before the next run. Stops on Ctrl+C.
+    """
+    wf = get_workflow()
+    logger.info(f"Serving scheduled maintenance every {interval_hours}h (lookback {lookback_days} days)")
+    try:
+        while True:
+            today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+            period_end = today - timedelta(days=1)
+            period_start = today - timedelta(days=lookback_days)
+            wf.run(period_start=period_start, period_end=period_end)
+            time.sleep(interval_hours * 3600)
+    except KeyboardInterrupt:
+        logger.info("Scheduled maintenance service stopped")
 
 
 def main():
@@ -190,29 +457,36 @@ def main():
     parser.add_argument("--end_date", type=str, help="End date for analysis (YYYY-MM-DD)")
     parser.add_argument("--mode", choices=["interactive", "args"], default="interactive", 
                         help="Date selection mode (default: interactive)")
+    parser.add_argument("--serve", action="store_true",
+                        help="Keep running and repeat the workflow every --interval_hours")
+    parser.add_argument("--interval_hours", type=float, default=24.0,
+                        help="Hours between runs in --serve mode (default: 24)")
+    parser.add_argument("--lookback_days", type=int, default=30,
+                        help="Days analysed per run in --serve mode (default: 30)")
     args = parser.parse_args()
     
+    if args.serve:
+        serve(interval_hours=args.interval_hours, lookback_days=args.lookback_days)
+        return {'status': 'stopped'}
+    
     try:
         # Use DateSelector for date range selection
         from agents.maintenance.tools.date_selector import DateSelector
         
         if args.start_date and args.end_date:
             # Use provided dates from command line
-            period_start = datetime.strptime(args.start_date, "%Y-%m-%d")
-            period_end = datetime.strptime(args.end_date, "%Y-%m-%d")
+            period_start = datetime.fromisoformat(args.start_date)
+            period_end = datetime.fromisoformat(args.end_date)
             logger.info(f"Using specified date range: {period_start.date()} to {period_end.date()}")
         else:
             # Use DateSelector for interactive selection
             start_date_str, end_date_str = DateSelector.get_date_range(mode=args.mode)
-            period_start = datetime.strptime(start_date_str, "%Y-%m-%d")
-            period_end = datetime.strptime(end_date_str, "%Y-%m-%d")
+            period_start = datetime.fromisoformat(start_date_str)
+            period_end = datetime.fromisoformat(end_date_str)
             logger.info(f"Selected date range: {period_start.date()} to {period_end.date()}")
         
-        # For the end date, set it to the end of day (23:59:59) to include all records from that day
-        period_end = period_end.replace(hour=23, minute=59, second=59, microsecond=999999)
-        
         # Initialize and run workflow
-        wf = ScheduledMaintenanceWorkflow()
+        wf = get_workflow()
         result = wf.run(
             period_start=period_start,
             period_end=period_end
@@ -220,7 +494,7 @@ def main():
         
         # Print summary
         print("\n=== Scheduled Maintenance Workflow Summary ===")
-        print(f"Analysis period: {period_start.strftime('%Y-%m-%d')} to {period_end.strftime('%Y-%m-%d')}")
+        print(f"Analysis period: {period_start.date().isoformat()} to {period_end.date().isoformat()}")
         print(f"Analysis status: {'Success' if result.get('analysis_success') else 'Failed'}")
         print(f"Tasks created: {result.get('tasks_created', 0)}")
         
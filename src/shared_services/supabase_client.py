@@ -2,13 +2,26 @@
 import os
 import logging
 import time
-from typing import Dict, Any, List, Optional, Union
+from typing import Callable, Dict, Any, Iterator, List, Optional, Sequence, Union
+import httpx
 from supabase.client import create_client
+from supabase.lib.client_options import ClientOptions
+from postgrest.utils import SyncClient
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger("supabase_client")
 
+# PostgREST connection pool, sized well under Supabase's pooler connection limit
+HTTP_TIMEOUT = 30
+HTTP_POOL_LIMITS = httpx.Limits(max_connections=10, max_keepalive_connections=10)
+
 class SupabaseClient:
     """Client for interacting with Supabase database."""
     
@@ -22,12 +35,41 @@ class SupabaseClient:
             raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set in environment variables")
         
         try:
-            self.client = create_client(self.supabase_url, self.supabase_key)
+            self.client = create_client(
+                self.supabase_url,
+                self.supabase_key,
+                options=ClientOptions(postgrest_client_timeout=HTTP_TIMEOUT)
+            )
+            self._configure_http_pool()
             logger.info("Supabase client initialized successfully")
         except Exception as e:
             logger.error(f"Error initializing Supabase client: {e}")
             raise
 
+    def _configure_http_pool(self) -> None:
+        """
+        Replace the PostgREST HTTP session with an explicitly pooled keep-alive client
+        so repeated queries reuse warm TCP/TLS connections. It stays a postgrest
+        SyncClient, which postgrest's own close path (aclose) relies on.
+        """
+        postgrest = self.client.postgrest
+        session = postgrest.session
+        postgrest.session = SyncClient(
+            base_url=session.base_url,
+            headers=session.headers,
+            timeout=HTTP_TIMEOUT,
+            limits=HTTP_POOL_LIMITS,
+            http2=HTTP2_AVAILABLE
+        )
+        session.close()
+
+    def table(self, table_name: str):
+        """
+        Return a PostgREST query builder for a table on the shared, pooled client.
+        Lets helpers that take a SupabaseClient build queries without creating their own client.
+        """
+        return self.client.table(table_name)
+
     def query_table(
         self,
         table_name: str,
@@ -50,24 +92,7 @@ class SupabaseClient:
         start = time.time()
         try:
             q = self.client.table(table_name).select(columns)
-            if filters:
-                for col, val in filters.items():
-                    if '.' in col:
-                        # Handle operators like gte, lte, etc.
-                        col_name, operator = col.split('.')
-                        if operator == 'gte':
-                            q = q.gte(col_name, val)
-                        elif operator == 'lte':
-                            q = q.lte(col_name, val)
-                        elif operator == 'gt':
-                            q = q.gt(col_name, val)
-                        elif operator == 'lt':
-                            q = q.lt(col_name, val)
-                        else:
-                            logger.warning(f"Unsupported operator {operator} for column {col_name}")
-                    else:
-                        # Simple equality filter
-                        q = q.eq(col, val)
+            q = self._apply_filters(q, filters)
             q = q.limit(limit)
             response = q.execute()
 
@@ -79,6 +104,177 @@ class SupabaseClient:
             logger.error(f"Error querying table {table_name}: {e}")
             raise
 
+    def count_rows(self, table_name: str, filters: Optional[Dict[str, Any]] = None) -> int:
+        """
+        Return the exact number of rows matching ``filters`` (same format as query_table)
+        without transferring the rows themselves.
+        """
+        start = time.time()
+        try:
+            q = self.client.table(table_name).select("id", count="exact")
+            q = self._apply_filters(q, filters)
+            response = q.limit(1).execute()
+            elapsed_ms = (time.time() - start) * 1000
+            logger.info(f"DB count for {table_name} took {elapsed_ms:.1f} ms ({response.count} rows)")
+            return response.count or 0
+        except Exception as e:
+            logger.error(f"Error counting rows in {table_name}: {e}")
+            raise
+
+    def query_table_paged(
+        self,
+        table_name: str,
+        columns: str = "*",
+        filters: Optional[Dict[str, Any]] = None,
+        order: Sequence[str] = ("resolved_at", "id"),
+        page_size: int = 5000
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Yield every matching record of a Supabase table using keyset pagination.
+
+        Pages are ordered by the ``order`` columns and each subsequent request
+        resumes strictly after the last row of the previous page, so there is no
+        row limit and no OFFSET rescans. PostgREST's server-side max-rows cap (1000
+        by default on Supabase) can return fewer than ``page_size`` rows on a page
+        that is not the last, so iteration only stops once a page comes back empty.
+
+        Rows with a NULL in any ``order`` column cannot be positioned by a keyset
+        and are excluded by the query.
+
+        Args:
+            table_name: Name of the table to query
+            columns: Columns to select; must include every ``order`` column
+            filters: Same filter format as ``query_table``
+            order: Unique sort key used for pagination (default: resolved_at, id)
+            page_size: Number of records requested per page (the server may return fewer)
+        """
+        yield from self._keyset_pages(
+            table_name,
+            lambda: self._apply_filters(self.client.table(table_name).select(columns), filters),
+            order,
+            page_size
+        )
+
+    def call_rpc_paged(
+        self,
+        function_name: str,
+        params: Optional[Dict[str, Any]] = None,
+        order: Sequence[str] = ("id",),
+        page_size: int = 1000
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Yield every row of a set-returning Postgres function, paged like query_table_paged.
+
+        PostgREST's max-rows cap also applies to RPC results, so a single call_rpc can
+        silently return a truncated set. Each page calls the function again with the
+        keyset applied to its result, so ``order`` must be a unique key of that result.
+        """
+        yield from self._keyset_pages(
+            f"rpc {function_name}",
+            lambda: self.client.rpc(function_name, params or {}),
+            order,
+            page_size
+        )
+
+    def _keyset_pages(
+        self,
+        name: str,
+        build_query: Callable[[], Any],
+        order: Sequence[str],
+        page_size: int
+    ) -> Iterator[Dict[str, Any]]:
+        """Run the keyset pagination loop over fresh queries from ``build_query``."""
+        last_key: Optional[List[Any]] = None
+        page_no = 0
+        total = 0
+        while True:
+            start = time.time()
+            try:
+                q = build_query()
+                for col in order:
+                    q = q.filter(col, "not.is", "null")
+                if last_key is not None:
+                    q.params = q.params.add("or", f"({self._keyset_condition(order, last_key)})")
+                q.params = q.params.add("order", self._order_param(order))
+                q.params = q.params.add("limit", str(page_size))
+                response = q.execute()
+            except Exception as e:
+                logger.error(f"Error querying {name} (page {page_no}): {e}")
+                raise
+
+            rows = response.data or []
+            page_no += 1
+            total += len(rows)
+            elapsed_ms = (time.time() - start) * 1000
+            logger.info(f"DB page {page_no} for {name} took {elapsed_ms:.1f} ms ({len(rows)} records)")
+
+            yield from rows
+
+            if not rows:
+                break
+            last_key = [rows[-1].get(col) for col in order]
+
+        logger.info(f"Successfully queried {name}: {total} records retrieved in {page_no} page(s)")
+
+    @staticmethod
+    def _apply_filters(q, filters: Optional[Dict[str, Any]]):
+        """Apply ``column`` / ``column.operator`` filters to a PostgREST query."""
+        if filters:
+            for col, val in filters.items():
+                if '.' in col:
+                    # Handle operators like gte, lte, etc.
+                    col_name, operator = col.split('.')
+                    if operator == 'gte':
+                        q = q.gte(col_name, val)
+                    elif operator == 'lte':
+                        q = q.lte(col_name, val)
+                    elif operator == 'gt':
+                        q = q.gt(col_name, val)
+                    elif operator == 'lt':
+                        q = q.lt(col_name, val)
+                    else:
+                        logger.warning(f"Unsupported operator {operator} for column {col_name}")
+                else:
+                    # Simple equality filter
+                    q = q.eq(col, val)
+        return q
+
+    @staticmethod
+    def _order_param(order: Sequence[str]) -> str:
+        """Build a single explicit PostgREST order, e.g. ``resolved_at.asc,id.asc``."""
+        return ",".join(f"{col}.asc" for col in order)
+
+    @staticmethod
+    def _quote_value(value: Any) -> str:
+        """Quote a value for a PostgREST logic tree, escaping backslashes and double quotes."""
+        if isinstance(value, bool):
+            text = "true" if value else "false"
+        else:
+            text = str(value)
+        text = text.replace("\\", "\\\\").replace('"', '\\"')
+        return f'"{text}"'
+
+    @classmethod
+    def _keyset_condition(cls, order: Sequence[str], last_key: Sequence[Any]) -> str:
+        """
+        Build a PostgREST ``or`` expression matching rows sorted after ``last_key``.
+
+        For order (a, b) this is ``a > va OR (a = va AND b > vb)``. NULL key values
+        have no position in the ordering and raise ValueError.
+        """
+        if len(order) != len(last_key):
+            raise ValueError("last_key must have one value per order column")
+        for col, value in zip(order, last_key):
+            if value is None:
+                raise ValueError(f"Cannot paginate after a NULL value in order column '{col}'")
+        values = [cls._quote_value(value) for value in last_key]
+        clauses = []
+        for i, col in enumerate(order):
+            terms = [f"{order[j]}.eq.{values[j]}" for j in range(i)]
+            terms.append(f"{col}.gt.{values[i]}")
+            clauses.append(terms[0] if len(terms) == 1 else f"and({','.join(terms)})")
+        return ",".join(clauses)
+
     def insert_data(self, table_name: str, data: Dict[str, Any]) -> Dict[str, Any]:
         """Insert a record into a Supabase table."""
         try:
@@ -108,6 +304,22 @@ class SupabaseClient:
             logger.error(f"Error updating {table_name}: {e}")
             raise
 
+    def call_rpc(self, function_name: str, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Call a Postgres function through PostgREST and return its rows.
+        Logs actual elapsed time for the database call.
+        """
+        start = time.time()
+        try:
+            response = self.client.rpc(function_name, params or {}).execute()
+            elapsed_ms = (time.time() - start) * 1000
+            data = response.data or []
+            logger.info(f"RPC {function_name} took {elapsed_ms:.1f} ms ({len(data)} rows)")
+            return data
+        except Exception as e:
+            logger.error(f"Error calling RPC {function_name}: {e}")
+            raise
+
     def get_schema_info(
         self,
         table_name: Optional[str] = None
@@ -0,0 +1,97 @@
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+# Ensure src/ directory is on sys.path for absolute imports
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(script_dir, "../../../.."))
+src_root = os.path.join(project_root, "src")
+if src_root not in sys.path:
+    sys.path.insert(0, src_root)
+
+from agents.maintenance.analytics.Scheduled_Maintenance import MachineCluster
+
+
+def _summaries():
+    """Fixed dataset: 12 healthy machines and 8 worn ones, with some spread in each group."""
+    summaries = []
+    for i in range(20):
+        worn = i >= 12
+        summaries.append({
+            "machineNumber": f"M{i:02d}",
+            "failure_count": (40 if worn else 5) + (i * 7) % 9,
+            "total_downtime_ms": ((900 if worn else 90) + (i * 37) % 120) * 60000.0,
+            "machineData": {
+                "purchaseDate": f"{(2008 if worn else 2019) + i % 4}-0{1 + i % 9}-15T00:00:00",
+                "make": "Juki",
+                "type": "Overlocker",
+            },
+        })
+    return summaries
+
+
+def _labels(dtype):
+    with patch.object(MachineCluster, "FEATURE_DTYPE", dtype):
+        result = MachineCluster.run_summary_analysis(_summaries())
+    return {row["machineNumber"]: row["cluster"] for row in result["aggregated_data"]}
+
+
+class TestFeatureDtype(unittest.TestCase):
+    def test_float32_labels_match_float64(self):
+        labels32 = _labels("float32")
+        labels64 = _labels("float64")
+
+        self.assertEqual(labels32, labels64)
+        # Sanity check that the dataset really separates into the two groups
+        self.assertEqual({m for m, c in labels64.items() if c == 1}, {f"M{i:02d}" for i in range(12, 20)})
+
+
+def _events():
+    """Raw downtime events for 20 machines; the first event per machine carries its machineData."""
+    events = []
+    for summary in _summaries():
+        for n in range(summary["failure_count"]):
+            events.append({
+                "id": len(events),
+                "machineNumber": summary["machineNumber"],
+                "machineData": summary["machineData"] if n == 0 else {"purchaseDate": "1990-01-01"},
+                "totalDowntime": summary["total_downtime_ms"] / summary["failure_count"],
+            })
+    return events
+
+
+class TestSummaryEquivalence(unittest.TestCase):
+    def test_summary_analysis_matches_event_analysis(self):
+        events = _events()
+        # What downtime_summary computes: count, summed downtime and first machineData per machine
+        summaries = {}
+        for event in events:
+            summary = summaries.setdefault(event["machineNumber"], {
+                "machineNumber": event["machineNumber"],
+                "failure_count": 0,
+                "total_downtime_ms": 0.0,
+                "machineData": event["machineData"],
+            })
+            summary["failure_count"] += 1
+            summary["total_downtime_ms"] += event["totalDowntime"]
+
+        from_events = MachineCluster.run_analysis(events)
+        from_summaries = MachineCluster.run_summary_analysis(list(summaries.values()))
+
+        self.assertEqual(
+            [(r["machineNumber"], r["cluster"], r["failure_count"]) for r in from_events["aggregated_data"]],
+            [(r["machineNumber"], r["cluster"], r["failure_count"]) for r in from_summaries["aggregated_data"]],
+        )
+        for a, b in zip(from_events["aggregated_data"], from_summaries["aggregated_data"]):
+            self.assertAlmostEqual(a["total_downtime_minutes"], b["total_downtime_minutes"], places=6)
+            self.assertAlmostEqual(a["machine_age_years"], b["machine_age_years"], places=6)
+            self.assertEqual((a["manufacturer"], a["machine_type"]), (b["manufacturer"], b["machine_type"]))
+        self.assertEqual(len(from_events["cluster_summary"]), len(from_summaries["cluster_summary"]))
+        for a, b in zip(from_events["cluster_summary"], from_summaries["cluster_summary"]):
+            for key in a:
+                self.assertAlmostEqual(a[key], b[key], places=6)
+
+
+if __name__ == "__main__":
+    unittest.main()
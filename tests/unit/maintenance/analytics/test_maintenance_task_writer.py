@@ -0,0 +1,132 @@
+import os
+import sys
+import unittest
+from unittest.mock import Mock, patch
+
+# Ensure src/ directory is on sys.path for absolute imports
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(script_dir, "../../../.."))
+src_root = os.path.join(project_root, "src")
+if src_root not in sys.path:
+    sys.path.insert(0, src_root)
+
+from agents.maintenance.analytics.Scheduled_Maintenance.maintenance_task_writer import (
+    INSERT_BATCH_SIZE,
+    MaintenanceTaskWriter,
+)
+from agents.maintenance.analytics.Scheduled_Maintenance.maintenance_task_scheduler import (
+    MaintenanceTaskScheduler,
+)
+
+
+def _rows(n):
+    return [{"machine_id": str(i), "priority": "high"} for i in range(n)]
+
+
+class TestInsertTasks(unittest.TestCase):
+    def setUp(self):
+        self.db = Mock()
+        self.insert = self.db.table.return_value.insert
+        self.insert.return_value.execute.side_effect = lambda: Mock(data=self.insert.call_args[0][0])
+        self.writer = MaintenanceTaskWriter(self.db)
+
+    def test_rows_are_chunked_by_batch_size(self):
+        inserted, failed = self.writer.insert_tasks(_rows(2 * INSERT_BATCH_SIZE + 7))
+
+        batch_sizes = [len(call.args[0]) for call in self.insert.call_args_list]
+        self.assertEqual(batch_sizes, [INSERT_BATCH_SIZE, INSERT_BATCH_SIZE, 7])
+        self.assertEqual(len(inserted), 2 * INSERT_BATCH_SIZE + 7)
+        self.assertEqual(failed, [])
+
+    def test_exact_multiple_sends_no_empty_batch(self):
+        self.writer.insert_tasks(_rows(INSERT_BATCH_SIZE))
+
+        self.assertEqual(self.insert.call_count, 1)
+
+    def test_failed_batch_is_returned_and_later_batches_still_run(self):
+        responses = iter([RuntimeError("timeout"), None])
+
+        def execute():
+            outcome = next(responses)
+            if outcome is not None:
+                raise outcome
+            return Mock(data=self.insert.call_args[0][0])
+
+        self.insert.return_value.execute.side_effect = execute
+
+        inserted, failed = self.writer.insert_tasks(_rows(INSERT_BATCH_SIZE + 3))
+
+        self.assertEqual(len(inserted), 3)
+        self.assertEqual(len(failed), 1)
+        self.assertEqual(len(failed[0]["rows"]), INSERT_BATCH_SIZE)
+        self.assertEqual(failed[0]["error"], "timeout")
+
+    def test_write_reports_failed_batches(self):
+        self.insert.return_value.execute.side_effect = RuntimeError("boom")
+        self.writer.ensure_tables_exist = Mock(return_value=True)
+        self.writer.get_machines_with_open_tasks = Mock(return_value=set())
+        machines = [{"machineNumber": str(i), "priority": "high", "failure_count": 9} for i in range(3)]
+        scheduler = Mock()
+        scheduler.assign_mechanics.return_value = [("M1", "A One")] * 3
+
+        result = self.writer.write_maintenance_tasks({"machines_to_service": machines}, scheduler)
+
+        self.assertEqual(result["tasks_created"], 0)
+        self.assertEqual(result["tasks_failed"], 3)
+        self.assertEqual(len(result["failed_batches"]), 1)
+        self.assertIn("error", result)
+
+
+class TestAssignMechanics(unittest.TestCase):
+    def _scheduler(self, mechanics, open_tasks):
+        db = Mock()
+        db.table.return_value.select.return_value.execute.return_value = Mock(data=mechanics)
+        db.query_table_paged.return_value = iter(open_tasks)
+        return MaintenanceTaskScheduler(db), db
+
+    def test_workload_is_read_with_paged_query(self):
+        mechanics = [{"employee_number": "M1", "name": "A", "surname": "One"}]
+        scheduler, db = self._scheduler(mechanics, [])
+
+        scheduler.assign_mechanics(1)
+
+        db.query_table_paged.assert_called_once()
+        args, kwargs = db.query_table_paged.call_args
+        self.assertEqual(args[0], "scheduled_maintenance")
+        self.assertEqual(kwargs["filters"], {"status": "open"})
+
+    def test_new_tasks_fill_least_loaded_mechanics_first(self):
+        mechanics = [
+            {"employee_number": "M1", "name": "A", "surname": "One"},
+            {"employee_number": "M2", "name": "B", "surname": "Two"},
+            {"employee_number": "M3", "name": "C", "surname": "Three"},
+        ]
+        open_tasks = [{"assignee": "M1"}] * 3 + [{"assignee": "M2"}]
+        scheduler, _ = self._scheduler(mechanics, open_tasks)
+
+        assignments = scheduler.assign_mechanics(5)
+
+        counts = {m: sum(1 for a, _ in assignments if a == m) for m in ("M1", "M2", "M3")}
+        # 3/1/0 open tasks plus 5 new ones levels everyone at 3
+        self.assertEqual(counts, {"M1": 0, "M2": 2, "M3": 3})
+        self.assertEqual(assignments[0], ("M3", "C Three"))
+
+    def test_no_mechanics_falls_back_to_unassigned(self):
+        scheduler, _ = self._scheduler([], [])
+
+        self.assertEqual(scheduler.assign_mechanics(2), [("unassigned", "Unassigned")] * 2)
+
+    def test_workload_query_failure_treats_everyone_as_idle(self):
+        mechanics = [{"employee_number": "M1", "name": "A", "surname": "One"},
+                     {"employee_number": "M2", "name": "B", "surname": "Two"}]
+        scheduler, db = self._scheduler(mechanics, [])
+        db.query_table_paged.side_effect = RuntimeError("down")
+
+        with patch("random.choice", side_effect=lambda seq: seq[0]):
+            assignments = scheduler.assign_mechanics(2)
+
+        self.assertEqual([a for a, _ in assignments], ["M1", "M2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,198 @@
+import os
+import sys
+import unittest
+from unittest.mock import Mock, patch
+
+# Ensure the project root (for src.*) and src/ (for absolute imports) are on sys.path
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(script_dir, "../../../.."))
+src_root = os.path.join(project_root, "src")
+for path in (project_root, src_root):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+# src.config.settings refuses to import without an LLM key; none is used here
+with patch.dict(os.environ, {"DEEPSEEK_API_KEY": os.environ.get("DEEPSEEK_API_KEY", "test")}):
+    from agents.maintenance.workflows import scheduled_maintenance_workflow as smw
+
+ScheduledMaintenanceWorkflow = smw.ScheduledMaintenanceWorkflow
+
+
+def _summary(**overrides):
+    summary = {
+        'analysis_success': True,
+        'tasks_created': 0,
+        'tasks_failed': 0,
+        'errors': [],
+        'cache_hit': False,
+        'result_cache_hit': False,
+        'machines': [{'machineNumber': 'M1'}],
+    }
+    summary.update(overrides)
+    return summary
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        smw._result_cache.clear()
+        self.addCleanup(smw._result_cache.clear)
+        self.workflow = ScheduledMaintenanceWorkflow.__new__(ScheduledMaintenanceWorkflow)
+        self.workflow._execute = Mock()
+
+    def _run(self):
+        return self.workflow.run(period_start="2024-01-01", period_end="2024-01-31")
+
+    def test_hit_returns_deep_copy_and_skips_execution(self):
+        self.workflow._execute.return_value = _summary()
+        first = self._run()
+        first['machines'][0]['machineNumber'] = 'mutated'
+
+        second = self._run()
+        second['machines'].append({'machineNumber': 'M2'})
+        third = self._run()
+
+        self.assertEqual(self.workflow._execute.call_count, 1)
+        self.assertFalse(first['result_cache_hit'])
+        self.assertTrue(second['result_cache_hit'])
+        self.assertEqual(third['machines'], [{'machineNumber': 'M1'}])
+
+    def test_result_cache_hit_is_separate_from_clustering_reuse(self):
+        self.workflow._execute.return_value = _summary(cache_hit=True)
+        self._run()
+
+        result = self._run()
+
+        self.assertTrue(result['result_cache_hit'])
+        self.assertTrue(result['cache_hit'])
+
+    def test_run_creating_tasks_clears_cache(self):
+        self.workflow._execute.return_value = _summary()
+        self.workflow.run(period_start="2023-01-01", period_end="2023-01-31")
+        self.workflow._execute.return_value = _summary(tasks_created=3)
+
+        self._run()
+
+        self.assertEqual(len(smw._result_cache), 0)
+
+    def test_run_with_errors_is_not_stored(self):
+        self.workflow._execute.return_value = _summary(errors=["boom"])
+
+        self._run()
+        self._run()
+
+        self.assertEqual(self.workflow._execute.call_count, 2)
+        self.assertEqual(len(smw._result_cache), 0)
+
+    def test_run_with_failed_inserts_is_not_stored(self):
+        self.workflow._execute.return_value = _summary(tasks_failed=2)
+
+        self._run()
+
+        self.assertEqual(len(smw._result_cache), 0)
+
+
+class TestDailyWindow(unittest.TestCase):
+    window = staticmethod(ScheduledMaintenanceWorkflow._daily_window)
+
+    def test_whole_utc_days(self):
+        filters = ScheduledMaintenanceWorkflow._date_filters("2024-01-01", "2024-01-31")
+
+        self.assertEqual(self.window(filters), ("2024-01-01", "2024-02-01"))
+
+    def test_naive_bound_mixed_with_aware_bound(self):
+        filters = {'resolved_at.gte': "2024-01-01T00:00:00",
+                   'resolved_at.lt': "2024-01-03T00:00:00+00:00"}
+
+        self.assertEqual(self.window(filters), ("2024-01-01", "2024-01-03"))
+
+    def test_aware_bound_converted_to_utc(self):
+        # 02:00 at +02:00 is UTC midnight; local midnight at +02:00 is not
+        on_utc_midnight = {'resolved_at.gte': "2024-01-01T02:00:00+02:00",
+                           'resolved_at.lt': "2024-01-03T00:00:00"}
+        off_utc_midnight = {'resolved_at.gte': "2024-01-01T00:00:00+02:00",
+                            'resolved_at.lt': "2024-01-03T00:00:00"}
+
+        self.assertEqual(self.window(on_utc_midnight), ("2024-01-01", "2024-01-03"))
+        self.assertIsNone(self.window(off_utc_midnight))
+
+    def test_non_midnight_bound(self):
+        filters = {'resolved_at.gte': "2024-01-01T06:30:00",
+                   'resolved_at.lt': "2024-01-05T00:00:00"}
+
+        self.assertIsNone(self.window(filters))
+
+    def test_sub_day_window(self):
+        filters = {'resolved_at.gte': "2024-01-01T00:00:00",
+                   'resolved_at.lt': "2024-01-01T00:00:00"}
+
+        self.assertIsNone(self.window(filters))
+
+    def test_open_ended_window(self):
+        self.assertIsNone(self.window({'resolved_at.gte': "2024-01-01T00:00:00"}))
+
+
+class TestMvFreshness(unittest.TestCase):
+    def setUp(self):
+        self.workflow = ScheduledMaintenanceWorkflow.__new__(ScheduledMaintenanceWorkflow)
+        self.workflow.db = Mock()
+
+    def _log(self, rows):
+        self.workflow.db.query_table.return_value = rows
+
+    def test_refreshed_after_window_end(self):
+        self._log([{'refreshed_at': "2024-02-01T02:00:03.51+00:00"}])
+
+        self.assertTrue(self.workflow._mv_covers("2024-02-01"))
+
+    def test_stale_refresh(self):
+        self._log([{'refreshed_at': "2024-01-31T02:00:00+00:00"}])
+
+        self.assertFalse(self.workflow._mv_covers("2024-02-01"))
+
+    def test_missing_log_row(self):
+        self._log([])
+
+        self.assertFalse(self.workflow._mv_covers("2024-02-01"))
+
+    def test_log_table_unavailable(self):
+        self.workflow.db.query_table.side_effect = RuntimeError("relation does not exist")
+
+        self.assertFalse(self.workflow._mv_covers("2024-02-01"))
+
+    def test_stale_view_falls_back_to_rpc(self):
+        self._log([{'refreshed_at': "2024-01-31T02:00:00+00:00"}])
+        self.workflow.db.call_rpc_paged.return_value = iter(
+            [{'machineNumber': 'M1', 'failure_count': 25, 'total_downtime_ms': 1.0, 'machineData': {}}]
+        )
+        filters = ScheduledMaintenanceWorkflow._date_filters("2024-01-01", "2024-01-31")
+
+        rows, summarized, event_count = self.workflow._fetch_records(filters)
+
+        self.workflow.db.query_table_paged.assert_not_called()
+        self.assertTrue(summarized)
+        self.assertEqual(event_count, 25)
+
+
+    def test_fresh_view_is_read_for_whole_days(self):
+        self._log([{'refreshed_at': "2024-02-01T02:00:00+00:00"}])
+        self.workflow.db.query_table_paged.return_value = iter([
+            {'machineNumber': 'M1', 'day': '2024-01-02', 'failure_count': 10,
+             'total_downtime_ms': 5.0, 'machineData': {'make': 'a'}},
+            {'machineNumber': 'M1', 'day': '2024-01-03', 'failure_count': 15,
+             'total_downtime_ms': 7.0, 'machineData': {'make': 'b'}},
+        ])
+        filters = ScheduledMaintenanceWorkflow._date_filters("2024-01-01", "2024-01-31")
+
+        rows, summarized, event_count = self.workflow._fetch_records(filters)
+
+        args = self.workflow.db.query_table_paged.call_args.kwargs
+        self.assertEqual(args['table_name'], "mv_machine_daily")
+        self.assertEqual(args['filters'], {'day.gte': "2024-01-01", 'day.lt': "2024-02-01"})
+        self.workflow.db.call_rpc_paged.assert_not_called()
+        self.assertEqual(rows, [{'machineNumber': 'M1', 'failure_count': 25,
+                                 'total_downtime_ms': 12.0, 'machineData': {'make': 'a'}}])
+        self.assertEqual(event_count, 25)
+
+
+if __name__ == "__main__":
+    unittest.main()
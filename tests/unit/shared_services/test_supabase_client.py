@@ -0,0 +1,224 @@
+import os
+import re
+import sys
+import unittest
+from unittest.mock import Mock, patch
+
+# Ensure src/ directory is on sys.path for absolute imports
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(script_dir, "../../.."))
+src_root = os.path.join(project_root, "src")
+if src_root not in sys.path:
+    sys.path.insert(0, src_root)
+
+from postgrest import SyncPostgrestClient
+from postgrest.utils import SyncClient
+
+from shared_services.supabase_client import SupabaseClient
+
+TERM = re.compile(r'^(\w+)\.(eq|gt)\."((?:[^"\\]|\\.)*)"$')
+
+
+def _split_top_level(expr):
+    parts, depth, current = [], 0, ""
+    for ch in expr:
+        if ch == "," and depth == 0:
+            parts.append(current)
+            current = ""
+            continue
+        depth += ch == "("
+        depth -= ch == ")"
+        current += ch
+    parts.append(current)
+    return parts
+
+
+def _matches(row, clause):
+    if clause.startswith("and("):
+        return all(_matches(row, term) for term in _split_top_level(clause[4:-1]))
+    col, op, raw = TERM.match(clause).groups()
+    value = type(row[col])(re.sub(r"\\(.)", r"\1", raw))
+    return row[col] == value if op == "eq" else row[col] > value
+
+
+def _serve(rows, params, max_rows=None):
+    """Answer one request from memory the way PostgREST applies keyset/order/limit params."""
+    order = [term.split(".")[0] for term in params["order"].split(",")]
+    rows = [r for r in rows if all(r[c] is not None for c in order)]
+    if "or" in params:
+        clauses = _split_top_level(params["or"][1:-1])
+        rows = [r for r in rows if any(_matches(r, c) for c in clauses)]
+    rows = sorted(rows, key=lambda r: tuple(r[c] for c in order))
+    limit = int(params["limit"])
+    if max_rows is not None:
+        limit = min(limit, max_rows)
+    return Mock(data=rows[:limit])
+
+
+class FakeTable:
+    """Serve rows from memory, honouring the keyset/order/limit params of a real request builder."""
+
+    def __init__(self, rows, max_rows=None):
+        self.rows = rows
+        self.max_rows = max_rows
+        self.requests = []
+
+    def __call__(self, table_name):
+        builder = SyncPostgrestClient("http://localhost").table(table_name)
+        builder.session = Mock()
+        fake = self
+
+        def execute(query):
+            params = dict(query.params.multi_items())
+            fake.requests.append(params)
+            return _serve(fake.rows, params, fake.max_rows)
+
+        original_select = builder.select
+
+        def select(*args, **kwargs):
+            query = original_select(*args, **kwargs)
+            query.execute = lambda: execute(query)
+            return query
+
+        builder.select = select
+        return builder
+
+
+class FakeRpc(FakeTable):
+    """Serve a set-returning function's rows from memory, like FakeTable."""
+
+    def __call__(self, function_name, params):
+        query = SyncPostgrestClient("http://localhost").rpc(function_name, params)
+        self.requests.append(None)
+        index = len(self.requests) - 1
+
+        def execute():
+            request = dict(query.params.multi_items())
+            self.requests[index] = request
+            return _serve(self.rows, request, self.max_rows)
+
+        query.execute = execute
+        return query
+
+
+class TestKeysetCondition(unittest.TestCase):
+    def test_single_column(self):
+        self.assertEqual(SupabaseClient._keyset_condition(("id",), [7]), 'id.gt."7"')
+
+    def test_two_columns(self):
+        self.assertEqual(
+            SupabaseClient._keyset_condition(("resolved_at", "id"), ["2024-01-01T00:00:00+00:00", 5]),
+            'resolved_at.gt."2024-01-01T00:00:00+00:00",'
+            'and(resolved_at.eq."2024-01-01T00:00:00+00:00",id.gt."5")',
+        )
+
+    def test_escapes_quotes_and_backslashes(self):
+        self.assertEqual(
+            SupabaseClient._keyset_condition(("name",), ['a"b\\c']),
+            'name.gt."a\\"b\\\\c"',
+        )
+
+    def test_booleans_use_postgrest_literals(self):
+        self.assertEqual(SupabaseClient._keyset_condition(("flag",), [True]), 'flag.gt."true"')
+
+    def test_null_key_rejected(self):
+        with self.assertRaises(ValueError):
+            SupabaseClient._keyset_condition(("resolved_at", "id"), [None, 5])
+
+    def test_key_length_mismatch_rejected(self):
+        with self.assertRaises(ValueError):
+            SupabaseClient._keyset_condition(("resolved_at", "id"), ["2024-01-01"])
+
+    def test_order_param(self):
+        self.assertEqual(SupabaseClient._order_param(("resolved_at", "id")), "resolved_at.asc,id.asc")
+
+
+class TestQueryTablePaged(unittest.TestCase):
+    def _client(self, rows, max_rows=None):
+        db = SupabaseClient.__new__(SupabaseClient)
+        db.client = Mock()
+        db.client.table = FakeTable(rows, max_rows)
+        return db
+
+    def test_server_max_rows_below_page_size_does_not_truncate(self):
+        rows = [{"resolved_at": f"2024-01-01T{i // 60 % 24:02d}:{i % 60:02d}:00", "id": i} for i in range(3000)]
+        db = self._client(rows, max_rows=1000)
+
+        result = list(db.query_table_paged("downtime_detail", columns="resolved_at,id", page_size=5000))
+
+        self.assertEqual(len(result), 3000)
+        self.assertEqual(len({r["id"] for r in result}), 3000)
+        # Three capped pages, then the empty page that ends the scan
+        self.assertEqual(len(db.client.table.requests), 4)
+
+    def test_ties_across_page_boundary(self):
+        # Five rows share one timestamp, so every page boundary falls inside a tie.
+        rows = [{"resolved_at": "2024-01-01T10:00:00", "id": i} for i in (12, 3, 9, 1, 30)]
+        rows += [{"resolved_at": "2024-01-01T09:00:00", "id": 50},
+                 {"resolved_at": "2024-01-02T08:00:00", "id": 2}]
+        db = self._client(rows)
+
+        result = list(db.query_table_paged("downtime_detail", columns="resolved_at,id", page_size=2))
+
+        self.assertEqual(
+            [(r["resolved_at"], r["id"]) for r in result],
+            sorted((r["resolved_at"], r["id"]) for r in rows),
+        )
+        self.assertEqual(len(db.client.table.requests), 5)
+
+    def test_sends_single_explicit_order_and_excludes_nulls(self):
+        rows = [{"resolved_at": "2024-01-01T10:00:00", "id": 1},
+                {"resolved_at": None, "id": 2}]
+        db = self._client(rows)
+
+        result = list(db.query_table_paged("downtime_detail", columns="resolved_at,id", page_size=10))
+
+        self.assertEqual([r["id"] for r in result], [1])
+        params = db.client.table.requests[0]
+        self.assertEqual(params["order"], "resolved_at.asc,id.asc")
+        self.assertEqual(params["resolved_at"], "not.is.null")
+        self.assertEqual(params["id"], "not.is.null")
+        self.assertNotIn("or", params)
+
+    def test_second_page_resumes_after_last_key(self):
+        rows = [{"resolved_at": "2024-01-01T10:00:00", "id": i} for i in range(1, 4)]
+        db = self._client(rows)
+
+        list(db.query_table_paged("downtime_detail", columns="resolved_at,id", page_size=2))
+
+        self.assertEqual(
+            db.client.table.requests[1]["or"],
+            '(resolved_at.gt."2024-01-01T10:00:00",and(resolved_at.eq."2024-01-01T10:00:00",id.gt."2"))',
+        )
+
+    def test_rpc_is_paged_past_the_server_cap(self):
+        rows = [{"machineNumber": f"M{i:04d}", "failure_count": 1} for i in range(2500)]
+        db = SupabaseClient.__new__(SupabaseClient)
+        db.client = Mock()
+        db.client.rpc = FakeRpc(rows, max_rows=1000)
+
+        result = list(db.call_rpc_paged("downtime_summary", {"p_start": None, "p_end": None},
+                                        order=("machineNumber",)))
+
+        self.assertEqual([r["machineNumber"] for r in result], [r["machineNumber"] for r in rows])
+        self.assertEqual(db.client.rpc.requests[1]["or"], '(machineNumber.gt."M0999")')
+        self.assertEqual(db.client.rpc.requests[0]["order"], "machineNumber.asc")
+
+
+class TestHttpPool(unittest.TestCase):
+    @patch.dict(os.environ, {"SUPABASE_URL": "https://example.supabase.co",
+                             "SUPABASE_KEY": "eyJhbGciOiJIUzI1NiJ9.e30.sig"})
+    def test_pooled_session_is_a_postgrest_sync_client(self):
+        db = SupabaseClient()
+        session = db.client.postgrest.session
+
+        self.assertIsInstance(session, SyncClient)
+        self.assertEqual(str(session.base_url).rstrip("/"), "https://example.supabase.co/rest/v1")
+        self.assertEqual(session.headers["apikey"], "eyJhbGciOiJIUzI1NiJ9.e30.sig")
+        # postgrest's own close path must keep working on the replaced session
+        db.client.postgrest.aclose()
+        self.assertTrue(session.is_closed)
+
+
+if __name__ == "__main__":
+    unittest.main()